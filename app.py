@@ -1,15 +1,22 @@
 """raspomushi - 日文歌詞瀏覽（無手動輸入），支援斷詞、假名顯示、關鍵字搜尋，並可加入 rasword 單字庫"""
 
+import functools
+import json
 import os
+import queue
 import re
 import sqlite3
 import time
 import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from urllib.parse import urljoin, quote
+from urllib.parse import urljoin, urlparse, quote
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from flask import Flask, jsonify, render_template, request
 
@@ -34,6 +41,9 @@ GEMINI_MODEL_PRIORITY = [
 ]
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# 認證／額度錯誤：換模型也一樣會失敗，直接中止
+GROQ_FATAL_STATUS = {401, 402, 403}
+GROQ_MAX_RETRY_AFTER = 30  # 429 時最多等待秒數
 # 保留此列表用於向後兼容，實際使用 preferred_models 和 fallback_models
 GROQ_FREE_MODELS = [
     "gpt-oss-120b",
@@ -51,24 +61,166 @@ UTA_NET_PAGE_PATHS = [
     "/artist/{}/".format(UTA_NET_ARTIST_ID),
     "/artist/{}/0/2/".format(UTA_NET_ARTIST_ID),
 ]
-UTA_NET_REQUEST_DELAY = 1.5
+UTA_NET_REQUEST_DELAY = 1.5  # 整體請求間隔（秒），跨 worker 共用
+UTA_NET_MAX_WORKERS = 4
+UTA_NET_COMMIT_BATCH = 20  # 每累積幾首新歌 commit 一次
+UTA_NET_MAX_PAGE_BYTES = 2_000_000  # 單頁最多讀取的位元組數
 UTA_NET_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0",
     "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "ja,en-US;q=0.7,en;q=0.3",
 }
+# 歌手一覽頁的歌曲連結：<a href="/song/12345/">
+_SONG_LINK_RE = re.compile(r"""href=["']/song/(\d+)""")
+_UTANET_TITLE_SUFFIX_RE = re.compile(r"\s*歌詞\s*-\s*歌ネット\s*$")
+_MULTI_NL_RE = re.compile(r"\n{3,}")
+# 歌詞區塊候選（依優先順序）：id 為 kashi_area / kashi，或 class 含 kashi_area / kashi / song_table
+_LYRICS_DIV_SELECTORS = (
+    "div#kashi_area",
+    "div#kashi",
+    'div[class*="kashi_area"]',
+    'div[class*="kashi"]',
+    'div[class*="song_table"]',
+)
+
+# 共用 HTTP session：重用連線（keep-alive），5xx 暫時性錯誤快速重試少數幾次
+# 429 不在重試範圍：adapter 內的重試會繞過 _throttle 的頻率限制，Retry-After 也不設上限
+_SESSION = requests.Session()
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=2, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+        respect_retry_after_header=False,
+    ),
+)
+_SESSION.mount("http://", _HTTP_ADAPTER)
+_SESSION.mount("https://", _HTTP_ADAPTER)
+
+
+class _TokenBucket:
+    """執行緒安全的 token bucket：每 interval 秒補充一個 token，最多累積 capacity 個"""
+
+    def __init__(self, interval, capacity=1):
+        self.interval = interval
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一個 token，不足時等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) / self.interval)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.interval
+            time.sleep(wait)
+
+
+ITUNES_SEARCH_URL = "https://itunes.apple.com/search"
+# 各主機的請求頻率限制（所有執行緒共用）；未列出的主機不限速
+_HOST_RATE_LIMITS = {
+    urlparse(UTA_NET_BASE_URL).hostname: _TokenBucket(UTA_NET_REQUEST_DELAY),
+    # iTunes Search API 約每分鐘 20 次：允許少量突發，平均每 3 秒一次
+    urlparse(ITUNES_SEARCH_URL).hostname: _TokenBucket(3.0, capacity=20),
+}
+
+
+def _throttle(url):
+    """依 URL 的主機套用對應的 token bucket"""
+    bucket = _HOST_RATE_LIMITS.get(urlparse(url).hostname)
+    if bucket is not None:
+        bucket.acquire()
+
+# 全文搜尋：SQLite 3.34+ 支援 trigram 分詞，日文（無空白）也能做子字串比對
+_FTS_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+_FTS_TOKENIZE = "trigram" if _FTS_TRIGRAM else "unicode61 remove_diacritics 2"
+# SQLite 3.35+ 支援 UPDATE ... RETURNING
+_SQLITE_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+DB_POOL_SIZE = 8  # 閒置連線最多保留幾條
+_DB_LOCAL = threading.local()
+_DB_POOL = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_DB_RO_POOL = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
 
-def get_db():
-    conn = sqlite3.connect(DATABASE)
+def _connect():
+    """建立新的資料庫連線（WAL 模式：讀取不會被寫入阻塞）"""
+    conn = sqlite3.connect(DATABASE, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA mmap_size=134217728")
+    return conn
+
+
+def _connect_readonly():
+    """
+    建立唯讀連線（給純讀取的 GET 端點）：以 mode=ro 開檔並設 query_only，
+    mmap 256MB 讓讀取直接走記憶體映射，減少逐頁 read() 系統呼叫。
+    WAL 模式記錄在資料庫檔內，唯讀連線同樣以 WAL 快照讀取。
+    """
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(DATABASE))}?mode=ro", uri=True, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-40000")
+    conn.execute("PRAGMA mmap_size=268435456")
     return conn
 
 
+# (執行緒屬性名稱, 連線池, 建立函式)，依 readonly 區分讀寫與唯讀連線
+_DB_KINDS = {
+    False: ("conn", _DB_POOL, _connect),
+    True: ("ro_conn", _DB_RO_POOL, _connect_readonly),
+}
+
+
+def get_db(readonly=False):
+    """
+    取得目前執行緒的資料庫連線，不需 close。
+    優先從連線池取用已開啟的連線；請求結束時由 _release_db 放回連線池，
+    因此即使開發伺服器每個請求都開新執行緒，連線仍可重複使用。
+    readonly=True 取得唯讀連線，只給不寫入的查詢使用。
+    """
+    attr, pool, connect = _DB_KINDS[readonly]
+    conn = getattr(_DB_LOCAL, attr, None)
+    if conn is None:
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = connect()
+        setattr(_DB_LOCAL, attr, conn)
+    return conn
+
+
+@app.teardown_appcontext
+def _release_db(exc):
+    """請求結束時撤銷未提交的交易，並把連線放回連線池（池滿才關閉）"""
+    for attr, pool, _ in _DB_KINDS.values():
+        conn = getattr(_DB_LOCAL, attr, None)
+        if conn is None:
+            continue
+        setattr(_DB_LOCAL, attr, None)
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
 def _get_setting(key):
     """取得設定值"""
     conn = get_db()
     row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
-    conn.close()
     return row["value"] if row else None
 
 
@@ -77,11 +229,18 @@ def _set_setting(key, value):
     conn = get_db()
     conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
     conn.commit()
-    conn.close()
+
+
+def _add_missing_columns(conn, table, columns):
+    """依 PRAGMA table_info 比對，只對缺少的欄位執行 ALTER TABLE ADD COLUMN"""
+    existing = {row["name"] for row in conn.execute(f"PRAGMA table_info('{table}')")}
+    for name, ddl in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
 
 
 def init_db():
-    conn = get_db()
+    conn = _connect()
     conn.execute("""
         CREATE TABLE IF NOT EXISTS lyrics (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -95,18 +254,11 @@ def init_db():
         )
     """)
     # 為現有資料庫新增欄位（如果不存在）
-    try:
-        conn.execute("ALTER TABLE lyrics ADD COLUMN last_opened_at TEXT")
-    except sqlite3.OperationalError:
-        pass  # 欄位已存在
-    try:
-        conn.execute("ALTER TABLE lyrics ADD COLUMN view_count INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass  # 欄位已存在
-    try:
-        conn.execute("ALTER TABLE lyrics ADD COLUMN saved_word_count INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass  # 欄位已存在
+    _add_missing_columns(conn, "lyrics", [
+        ("last_opened_at", "TEXT"),
+        ("view_count", "INTEGER DEFAULT 0"),
+        ("saved_word_count", "INTEGER DEFAULT 0"),
+    ])
     
     # 設定表（用於存儲 AI API 設定）
     conn.execute("""
@@ -126,72 +278,230 @@ def init_db():
         )
     """)
     # 為現有資料庫新增欄位（如果不存在）
+    _add_missing_columns(conn, "translations", [("model_used", "TEXT")])
+
+    # 列表排序與查詢用索引
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lyrics_last_opened ON lyrics(last_opened_at DESC, created_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lyrics_view_count ON lyrics(view_count DESC, last_opened_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lyrics_saved_words ON lyrics(saved_word_count DESC, last_opened_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_lyric ON translations(lyric_id, created_at DESC)")
+    # 歌名唯一索引：crawl_uta_net.py 的 upsert 依賴它，名稱只能給唯一索引使用
+    title_index = {row["name"]: row["unique"] for row in conn.execute("PRAGMA index_list('lyrics')")}
+    if title_index.get("idx_lyrics_title") == 0:
+        # 舊版在重複歌名時建立過同名的非唯一索引，先移除再重試唯一索引
+        conn.execute("DROP INDEX idx_lyrics_title")
     try:
-        conn.execute("ALTER TABLE translations ADD COLUMN model_used TEXT")
-    except sqlite3.OperationalError:
-        pass  # 欄位已存在
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_lyrics_title ON lyrics(title)")
+    except sqlite3.IntegrityError:
+        # 既有資料有重複歌名，無法建立唯一索引，退而以另一個名稱建立一般索引
+        print("[raspomushi] lyrics 有重複歌名，無法建立唯一索引 idx_lyrics_title（需先清除重複歌名）", flush=True)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lyrics_title_lookup ON lyrics(title)")
+    else:
+        # 唯一索引已涵蓋歌名查詢，不再需要一般索引
+        conn.execute("DROP INDEX IF EXISTS idx_lyrics_title_lookup")
+
+    # 全文搜尋索引（external content，由 trigger 與 lyrics 同步）
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lyrics_fts'"
+    ).fetchone()
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS lyrics_fts USING fts5(
+            title, content,
+            content='lyrics', content_rowid='id',
+            tokenize='{_FTS_TOKENIZE}'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS lyrics_ai AFTER INSERT ON lyrics BEGIN
+            INSERT INTO lyrics_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS lyrics_ad AFTER DELETE ON lyrics BEGIN
+            INSERT INTO lyrics_fts(lyrics_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+    """)
+    # 只在歌名或歌詞變動時更新索引（view_count 等欄位更新不影響）
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS lyrics_au AFTER UPDATE OF title, content ON lyrics BEGIN
+            INSERT INTO lyrics_fts(lyrics_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO lyrics_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """)
+    if not has_fts:
+        # 首次建立索引時回填現有歌詞
+        conn.execute("INSERT INTO lyrics_fts(rowid, title, content) SELECT id, title, content FROM lyrics")
     
     conn.commit()
     conn.close()
 
 
+_CJK_RE = re.compile(r'[\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff\uac00-\ud7af]')
+
+
+def _contains_cjk(s):
+    """是否含平假名、片假名、漢字或韓文"""
+    return _CJK_RE.search(s) is not None
+
+
+def _fts_query(keyword):
+    """將使用者輸入轉成 FTS5 查詢：每個詞以雙引號包住（避免被當成運算子），以 AND 連接"""
+    terms = []
+    for term in keyword.split():
+        quoted = '"' + term.replace('"', '""') + '"'
+        # trigram 本身即為子字串比對；unicode61 則加上 * 做前綴搜尋
+        terms.append(quoted if _FTS_TRIGRAM else quoted + '*')
+    return ' '.join(terms)
+
+
+# 列表只取顯示需要的欄位：歌詞內容只取前 101 個字當預覽（多 1 字讓前端判斷要不要加 ...）
+_LYRIC_LIST_COLUMNS = """
+    {p}id, {p}title, substr({p}content, 1, 101) AS preview,
+    {p}view_count, {p}saved_word_count, {p}last_opened_at, {p}created_at, {p}updated_at
+"""
+LYRIC_SEARCH_LIMIT = 50  # /api/lyrics/search 最多回傳筆數
+
+
+def _keyword_search(conn, keyword, fts_sql, fts_params, like_sql, like_params):
+    """
+    依關鍵字選擇全文索引或 LIKE 查詢，回傳查詢結果。
+    fts_sql 的第一個參數為 MATCH ?（由此函式填入 _fts_query(keyword)），其餘依序接 fts_params；
+    like_sql 與 like_params 為 FTS 不適用或找不到結果時的替代查詢。
+    """
+    if _FTS_TRIGRAM and any(len(t) < 3 for t in keyword.split()):
+        # trigram 無法比對少於 3 個字的詞，改用 LIKE
+        return conn.execute(like_sql, like_params).fetchall()
+    rows = conn.execute(fts_sql, (_fts_query(keyword), *fts_params)).fetchall()
+    if not rows and _contains_cjk(keyword):
+        # 分詞器切不好日文等無空白語言時可能漏掉結果，改用 LIKE 再找一次
+        rows = conn.execute(like_sql, like_params).fetchall()
+    return rows
+
+
+# 簡易斷詞的分割點：
+# 標點符號（以及所有空白字元）
+# 助詞：は、が、を、に、で、と、から、まで、より、へ、の、も、など
+# 動詞變化：ます、です、だ、である、て、た、だ、など
+_SEG_PUNCT = frozenset('，。、！？；：')
+_SEG_PARTICLES = frozenset('はがをにでとからまでよりへのも')
+_SEG_VERB_ENDINGS = frozenset('ますですだてた')
+_INLINE_SPACES = frozenset(' \t')
+
+_TAGGER = None
+_TAGGER_LOCK = threading.Lock()
+
+
+def _get_tagger():
+    """延遲建立 fugashi Tagger（載入 UniDic 成本高），以 lock 避免並行請求重複初始化；無法使用時回傳 None"""
+    global _TAGGER
+    if _TAGGER is None:
+        with _TAGGER_LOCK:
+            if _TAGGER is None:
+                try:
+                    from fugashi import Tagger
+                    _TAGGER = Tagger()
+                except Exception as e:
+                    print(f"[raspomushi] 無法載入 fugashi，改用簡易斷詞：{e}", flush=True)
+                    _TAGGER = False
+    return _TAGGER or None
+
+
 def segment_japanese_text(text: str) -> list:
     """
-    簡單的日文斷詞（以空白、標點符號分割，保留日文字元）。
-    更精確的斷詞可以使用 janome 或 mecab，這裡先用簡單方式。
-    會嘗試在助詞、動詞變化等位置分割，讓單字更容易點擊。
+    日文斷詞：以 MeCab（fugashi）做形態素分析，無法使用時退回簡易規則斷詞。
     保留原始空格和換行，空格維持為空格顯示。
     """
     if not text:
         return []
-    
-    # 保留原始空格和換行，不進行任何空白處理
-    # 日文助詞和常見分割點
-    # 助詞：は、が、を、に、で、と、から、まで、より、へ、の、も、など
-    # 動詞變化：ます、です、だ、である、て、た、だ、など
-    # 標點符號
-    split_pattern = r'([\s，。、！？；：\n])|([はがをにでとからまでよりへのも]+)|([ますですだてた]+)'
-    
+
+    tagger = _get_tagger()
+    if tagger is None:
+        return _segment_japanese_text_simple(text)
+
+    # MeCab Tagger 非執行緒安全，同一時間只讓一個請求使用；lock 內只做分析
+    with _TAGGER_LOCK:
+        surfaces = [word.surface for word in tagger(text)]
+
+    # MeCab 會略過空白：沿原文逐詞對齊，把詞與詞之間（含結尾）的文字補回
     segments = []
-    last_end = 0
-    
-    for match in re.finditer(split_pattern, text):
-        # 添加匹配前的文字
-        if match.start() > last_end:
-            word = text[last_end:match.start()]
-            if word:
-                segments.append(word)
+    pos = 0
+    for surface in surfaces:
+        start = text.find(surface, pos)
+        if start < 0:
+            # 對不上原文（MeCab 改寫了字元等），改用簡易斷詞，避免漏掉歌詞內容
+            return _segment_japanese_text_simple(text)
+        _append_gap_segments(segments, text[pos:start])
+        if surface.strip():
+            segments.append(surface)
+        pos = start + len(surface)
+    _append_gap_segments(segments, text[pos:])
+    return segments or [text]
+
+
+def _append_gap_segments(segments, gap):
+    """補回 MeCab 詞與詞之間的文字：空格、tab、換行逐字保留，其他空白略過，非空白文字各自成詞"""
+    word_start = 0
+    for i, c in enumerate(gap):
+        if c.isspace():
+            if i > word_start:
+                segments.append(gap[word_start:i])
+            if c == '\n' or c in _INLINE_SPACES:
+                segments.append(c)
+            word_start = i + 1
+    if len(gap) > word_start:
+        segments.append(gap[word_start:])
+
+
+def _segment_japanese_text_simple(text: str) -> list:
+    """
+    簡單的日文斷詞（以空白、標點符號分割，保留日文字元）。
+    會嘗試在助詞、動詞變化等位置分割，讓單字更容易點擊。
+    保留原始空格和換行，空格維持為空格顯示。
+    """
+    # 逐字掃描一次，以 frozenset 判斷字元類別（不經過正則引擎）
+    segments = []
+    n = len(text)
+    i = 0
+    word_start = 0  # 尚未輸出的一般文字起點
+    
+    while i < n:
+        c = text[i]
+        if c in _SEG_PUNCT or c.isspace():
+            # 添加分隔符前的文字
+            if i > word_start:
+                segments.append(text[word_start:i])
+            # 換行、空格和 tab 保留原樣（前端顯示為換行／空格），標點符號單獨成詞，其他空白略過
+            if c == '\n' or c in _INLINE_SPACES or not c.isspace():
+                segments.append(c)
+            i += 1
+            word_start = i
+            continue
         
-        # 添加分隔符（保留所有空白、換行和標點）
-        if match.group(1):  # 空白、換行或標點
-            if match.group(1) == '\n':
-                segments.append('\n')
-            elif match.group(1) in ' \t':
-                # 空格和 tab：保留原樣，前端顯示為空格
-                segments.append(match.group(1))
-            elif match.group(1).strip():
-                # 標點符號
-                segments.append(match.group(1))
-        elif match.group(2) or match.group(3):  # 助詞或動詞變化
-            # 將助詞/動詞變化作為單獨的詞
-            segments.append(match.group(0))
+        if c in _SEG_PARTICLES:
+            char_set = _SEG_PARTICLES
+        elif c in _SEG_VERB_ENDINGS:
+            char_set = _SEG_VERB_ENDINGS
+        else:
+            i += 1
+            continue
         
-        last_end = match.end()
+        # 助詞／動詞變化：連續同類字元作為單獨的詞
+        if i > word_start:
+            segments.append(text[word_start:i])
+        j = i + 1
+        while j < n and text[j] in char_set:
+            j += 1
+        segments.append(text[i:j])
+        i = word_start = j
     
     # 添加剩餘文字
-    if last_end < len(text):
-        word = text[last_end:]
-        if word:
-            segments.append(word)
+    if word_start < n:
+        segments.append(text[word_start:])
     
     # 如果沒有匹配到任何分割點，使用簡單分割
-    if not segments:
-        segments = [text]
-    
-    # 過濾空字串（但保留空格標記）
-    segments = [s for s in segments if s]
-    
-    return segments
+    return segments or [text]
 
 
 def _extract_sentence3_from_lyrics(text, word, context_text="", context_offset=None):
@@ -231,49 +541,118 @@ def index():
 def get_lyrics():
     """取得所有歌詞列表，支援關鍵字搜尋和排序"""
     keyword = request.args.get('keyword', '').strip()
-    sort_by = request.args.get('sort', 'recent')  # recent, popular, words
+    sort_by = request.args.get('sort', 'recent')  # recent, popular, words, relevance
     
-    conn = get_db()
+    conn = get_db(readonly=True)
     
     # 建立排序 SQL
     if sort_by == 'popular':
         order_by = 'view_count DESC, last_opened_at DESC'
     elif sort_by == 'words':
         order_by = 'saved_word_count DESC, last_opened_at DESC'
-    else:  # recent (預設)
+    else:  # recent (預設)；relevance 在沒有全文搜尋時也用此排序
         order_by = 'last_opened_at DESC, created_at DESC'
     
+    like_sql = f"""
+        SELECT {_LYRIC_LIST_COLUMNS.format(p='')} FROM lyrics 
+        WHERE title LIKE ? OR content LIKE ?
+        ORDER BY {order_by}
+    """
+    like_params = (f'%{keyword}%', f'%{keyword}%')
+
     if keyword:
-        # 關鍵字搜尋：在標題或內容中搜尋
-        lyrics = conn.execute(f"""
-            SELECT * FROM lyrics 
-            WHERE title LIKE ? OR content LIKE ?
+        # 關鍵字搜尋：透過全文索引在標題或內容中搜尋
+        if sort_by == 'relevance':
+            order_by = 'bm25(lyrics_fts), l.updated_at DESC'
+        fts_sql = f"""
+            SELECT {_LYRIC_LIST_COLUMNS.format(p='l.')} FROM lyrics l
+            JOIN lyrics_fts ON lyrics_fts.rowid = l.id
+            WHERE lyrics_fts MATCH ?
             ORDER BY {order_by}
-        """, (f'%{keyword}%', f'%{keyword}%')).fetchall()
+        """
+        lyrics = _keyword_search(conn, keyword, fts_sql, (), like_sql, like_params)
     else:
         lyrics = conn.execute(f"""
-            SELECT * FROM lyrics 
+            SELECT {_LYRIC_LIST_COLUMNS.format(p='')} FROM lyrics 
             ORDER BY {order_by}
         """).fetchall()
     
-    conn.close()
     return jsonify([dict(l) for l in lyrics])
 
 
+@app.route('/api/lyrics/search', methods=['GET'])
+def search_lyrics():
+    """全文搜尋歌詞，依相關度排序，每筆只回傳命中處前後的片段（以 <mark> 標示）而非整首歌詞"""
+    keyword = request.args.get('keyword', '').strip()
+    if not keyword:
+        return jsonify({'error': '請輸入關鍵字'}), 400
+
+    conn = get_db(readonly=True)
+    # FTS 無法使用時的替代：以 LIKE 搜尋，片段取第一個詞在內容中出現處的前後文字，格式與 snippet() 相同
+    # （以 <mark> 標示命中處，截斷處加 …）；lower() 與 LIKE 一樣只忽略 ASCII 大小寫
+    first_term = keyword.split()[0]
+    like_sql = """
+        SELECT id, title, updated_at,
+               CASE WHEN hit > 0 THEN
+                   CASE WHEN hit > 21 THEN '…' ELSE '' END
+                   || substr(content, max(hit - 20, 1), min(hit - 1, 20))
+                   || '<mark>' || substr(content, hit, :n) || '</mark>'
+                   || substr(content, hit + :n, 30)
+                   || CASE WHEN length(content) > hit + :n + 29 THEN '…' ELSE '' END
+               ELSE substr(content, 1, 60) END AS snippet
+        FROM (
+            SELECT *, instr(lower(content), lower(:term)) AS hit FROM lyrics
+            WHERE title LIKE :pattern OR content LIKE :pattern
+        )
+        ORDER BY last_opened_at DESC, created_at DESC
+        LIMIT :limit
+    """
+    like_params = {
+        'term': first_term, 'n': len(first_term),
+        'pattern': f'%{keyword}%', 'limit': LYRIC_SEARCH_LIMIT,
+    }
+
+    fts_sql = """
+        SELECT l.id, l.title, l.updated_at,
+               snippet(lyrics_fts, 1, '<mark>', '</mark>', '…', 10) AS snippet
+        FROM lyrics_fts
+        JOIN lyrics l ON l.id = lyrics_fts.rowid
+        WHERE lyrics_fts MATCH ?
+        ORDER BY bm25(lyrics_fts), l.updated_at DESC
+        LIMIT ?
+    """
+    results = _keyword_search(conn, keyword, fts_sql, (LYRIC_SEARCH_LIMIT,), like_sql, like_params)
+
+    return jsonify([dict(r) for r in results])
+
+
 @app.route('/api/lyrics/<int:lyric_id>', methods=['GET'])
 def get_lyric(lyric_id):
     """取得單首歌詞詳情，並更新開啟時間和點閱次數"""
     conn = get_db()
+    now = datetime.now().isoformat()
+
+    if _SQLITE_RETURNING:
+        # 單一語句完成更新並取回更新後的資料
+        lyric = conn.execute("""
+            UPDATE lyrics 
+            SET last_opened_at = ?, view_count = view_count + 1
+            WHERE id = ?
+            RETURNING *
+        """, (now, lyric_id)).fetchone()
+        conn.commit()
+        if not lyric:
+            return jsonify({'error': '找不到歌詞'}), 404
+        return jsonify(dict(lyric))
+
     lyric = conn.execute("""
         SELECT * FROM lyrics WHERE id = ?
     """, (lyric_id,)).fetchone()
     
     if not lyric:
-        conn.close()
         return jsonify({'error': '找不到歌詞'}), 404
     
     # 更新 last_opened_at 和 view_count
-    now = datetime.now().isoformat()
     conn.execute("""
         UPDATE lyrics 
         SET last_opened_at = ?, view_count = view_count + 1
@@ -285,7 +664,6 @@ def get_lyric(lyric_id):
     lyric = conn.execute("""
         SELECT * FROM lyrics WHERE id = ?
     """, (lyric_id,)).fetchone()
-    conn.close()
     
     return jsonify(dict(lyric))
 
@@ -296,62 +674,60 @@ def delete_lyric(lyric_id):
     conn = get_db()
     conn.execute("DELETE FROM lyrics WHERE id = ?", (lyric_id,))
     conn.commit()
-    conn.close()
     
     return jsonify({'success': True})
 
 
 def _fetch_uta_net(url):
-    """請求 uta-net 頁面"""
-    r = requests.get(url, headers=UTA_NET_HEADERS, timeout=15)
-    r.raise_for_status()
-    r.encoding = r.apparent_encoding or "utf-8"
-    return r.text
+    """請求 uta-net 頁面（串流讀取，最多讀 UTA_NET_MAX_PAGE_BYTES）"""
+    _throttle(url)
+    r = _SESSION.get(url, headers=UTA_NET_HEADERS, timeout=15, stream=True)
+    with r:
+        r.raise_for_status()
+        chunks = []
+        size = 0
+        # iter_content 會自動解 gzip；讀完整頁時連線會歸還連線池重用
+        for chunk in r.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= UTA_NET_MAX_PAGE_BYTES:
+                break
+    body = b"".join(chunks)[:UTA_NET_MAX_PAGE_BYTES]
+    # 以回應標頭的 charset 為準；未宣告時 requests 預設為 ISO-8859-1，uta-net 實際為 UTF-8
+    # （不用 apparent_encoding，避免對整頁 HTML 做編碼偵測）
+    encoding = r.encoding
+    if not encoding or encoding.lower() == "iso-8859-1":
+        encoding = "utf-8"
+    return body.decode(encoding, errors="replace")
 
 
 def _extract_song_ids_from_artist_page(html):
     """從歌手一覽頁解析出所有歌曲頁的 ID"""
-    soup = BeautifulSoup(html, "html.parser")
-    ids = []
-    for a in soup.find_all("a", href=True):
-        m = re.match(r"/song/(\d+)/?", a.get("href", ""))
-        if m:
-            sid = m.group(1)
-            if sid not in ids:
-                ids.append(sid)
-    return ids
+    # 只需要連結中的數字 ID，直接對原始 HTML 做一次正則掃描，不建 DOM；dict.fromkeys 去重並保持順序
+    return list(dict.fromkeys(_SONG_LINK_RE.findall(html)))
 
 
 def _extract_title_and_lyrics(html):
     """從歌曲頁解析歌名與歌詞本文"""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, "lxml")
     title = ""
     h2 = soup.find("h2")
     if h2:
         title = (h2.get_text(strip=True) or "").strip()
     if not title and soup.title:
         t = soup.title.string or ""
-        t = re.sub(r"\s*歌詞\s*-\s*歌ネット\s*$", "", t).strip()
+        t = _UTANET_TITLE_SUFFIX_RE.sub("", t).strip()
         if t:
             parts = t.split(None, 1)
             title = parts[1] if len(parts) > 1 else parts[0]
     if not title:
         title = "unknown"
 
-    lyrics_div = soup.find("div", id="kashi_area") or soup.find("div", id="kashi")
-    if not lyrics_div:
-        for c in ("kashi_area", "kashi", "song_table"):
-            lyrics_div = soup.find("div", class_=lambda x: x and c in (x or ""))
-            if lyrics_div:
-                break
-    if not lyrics_div:
-        for div in soup.find_all("div"):
-            if div.get("id") in ("header", "footer", "nav", "menu"):
-                continue
-            text = div.get_text(separator="\n", strip=True)
-            if len(text) > 100 and ("歌詞" in text or "作詞" in div.get_text()):
-                lyrics_div = div
-                break
+    lyrics_div = None
+    for selector in _LYRICS_DIV_SELECTORS:
+        lyrics_div = soup.select_one(selector)
+        if lyrics_div:
+            break
 
     content = ""
     if lyrics_div:
@@ -362,43 +738,66 @@ def _extract_title_and_lyrics(html):
             content = content.split("この歌詞をマイ歌ネットに登録")[0].strip()
         if "この曲のフレーズを投稿" in content:
             content = content.split("この曲のフレーズを投稿")[0].strip()
-        content = re.sub(r"\n{3,}", "\n\n", content).strip()
+        content = _MULTI_NL_RE.sub("\n\n", content).strip()
 
     return title, content
 
 
+def _fetch_song(sid):
+    """下載並解析單首歌曲頁（於 worker thread 執行）"""
+    url = urljoin(UTA_NET_BASE_URL, "/song/{}/".format(sid))
+    return _extract_title_and_lyrics(_fetch_uta_net(url))
+
+
+def _insert_lyrics_batch(conn, rows, errors):
+    """在單一交易中寫入多首新歌，回傳成功寫入的數量；rows 寫入後清空"""
+    try:
+        # 先排除這段期間已被其他程式（如 crawl_uta_net.py）寫入的歌名，避免整批因重複而失敗
+        placeholders = ",".join("?" * len(rows))
+        taken = {
+            row[0] for row in conn.execute(
+                f"SELECT title FROM lyrics WHERE title IN ({placeholders})",
+                [r[0] for r in rows],
+            )
+        }
+        new_rows = [r for r in rows if r[0] not in taken]
+        with conn:
+            conn.executemany(
+                """INSERT INTO lyrics (title, content, created_at, updated_at)
+                   VALUES (?, ?, ?, ?)""",
+                new_rows,
+            )
+        return len(new_rows)
+    except sqlite3.Error as e:
+        errors.append({'titles': [r[0] for r in rows], 'error': str(e)})
+        return 0
+    finally:
+        rows.clear()
+
+
 def _do_check_new_songs():
     """背景執行：檢查新歌並寫入資料庫"""
     try:
-        conn = get_db()
+        conn = _connect()
         now = datetime.now().isoformat()
 
         # 1) 取得資料庫中現有的歌名集合
-        existing_titles = set()
-        for row in conn.execute("SELECT title FROM lyrics").fetchall():
-            existing_titles.add(row[0])
+        existing_titles = {row[0] for row in conn.execute("SELECT title FROM lyrics")}
 
-        # 2) 爬取歌手列表頁，取得所有 song IDs
-        all_song_ids = []
+        # 2) 爬取歌手列表頁，取得所有 song IDs（dict 當作保持順序的集合，邊收集邊去重）
+        all_song_ids = {}
         for path in UTA_NET_PAGE_PATHS:
             url = urljoin(UTA_NET_BASE_URL, path)
             try:
                 html = _fetch_uta_net(url)
                 ids = _extract_song_ids_from_artist_page(html)
-                all_song_ids.extend(ids)
-                time.sleep(UTA_NET_REQUEST_DELAY)
+                all_song_ids.update(dict.fromkeys(ids))
             except Exception as e:
                 print(f"[raspomushi] 無法取得歌手列表頁 {url}: {e}", flush=True)
                 conn.close()
                 return
 
-        # 去重
-        seen = set()
-        unique_ids = []
-        for i in all_song_ids:
-            if i not in seen:
-                seen.add(i)
-                unique_ids.append(i)
+        unique_ids = list(all_song_ids)
 
         if not unique_ids:
             print("[raspomushi] 未找到任何歌曲（可能遇到 EU/GDPR 限制）", flush=True)
@@ -407,46 +806,40 @@ def _do_check_new_songs():
         
         print(f"[raspomushi] 開始檢查 {len(unique_ids)} 首歌曲...", flush=True)
 
-        # 3) 對每個 song ID，爬取歌詞頁，比對資料庫，只新增不重複的
+        # 3) 平行爬取各歌詞頁（worker 只負責下載與解析），資料庫寫入統一在本執行緒
         inserted = 0
         skipped = 0
         errors = []
+        pending = []
 
-        for i, sid in enumerate(unique_ids):
-            url = urljoin(UTA_NET_BASE_URL, "/song/{}/".format(sid))
-            try:
-                html = _fetch_uta_net(url)
-                title, content = _extract_title_and_lyrics(html)
-            except Exception as e:
-                errors.append({'song_id': sid, 'error': str(e)})
-                time.sleep(UTA_NET_REQUEST_DELAY)
-                continue
-
-            if not content or len(content) < 10:
-                skipped += 1
-                time.sleep(UTA_NET_REQUEST_DELAY)
-                continue
-
-            # 檢查是否已存在
-            cur = conn.execute("SELECT id FROM lyrics WHERE title = ?", (title,))
-            row = cur.fetchone()
-            if row:
-                skipped += 1
-            else:
-                # 新歌，寫入資料庫
+        with ThreadPoolExecutor(max_workers=UTA_NET_MAX_WORKERS) as executor:
+            futures = {executor.submit(_fetch_song, sid): sid for sid in unique_ids}
+            for i, future in enumerate(as_completed(futures)):
+                sid = futures[future]
                 try:
-                    conn.execute(
-                        """INSERT INTO lyrics (title, content, created_at, updated_at)
-                           VALUES (?, ?, ?, ?)""",
-                        (title, content, now, now),
-                    )
-                    conn.commit()  # 每首立即 commit，避免重載時丟失資料
-                    inserted += 1
-                    print(f"[raspomushi] [{i+1}/{len(unique_ids)}] 新增：{title}", flush=True)
+                    title, content = future.result()
                 except Exception as e:
-                    errors.append({'title': title, 'error': str(e)})
+                    errors.append({'song_id': sid, 'error': str(e)})
+                    continue
+
+                if not content or len(content) < 10:
+                    skipped += 1
+                    continue
+
+                # 檢查是否已存在（以一開始取得的歌名集合比對，不再逐首查詢）
+                if title in existing_titles:
+                    skipped += 1
+                    continue
+
+                # 新歌，累積後批次寫入（分批 commit，避免重載時丟失太多資料）
+                existing_titles.add(title)
+                pending.append((title, content, now, now))
+                print(f"[raspomushi] [{i+1}/{len(unique_ids)}] 新增：{title}", flush=True)
+                if len(pending) >= UTA_NET_COMMIT_BATCH:
+                    inserted += _insert_lyrics_batch(conn, pending, errors)
 
-            time.sleep(UTA_NET_REQUEST_DELAY)
+        if pending:
+            inserted += _insert_lyrics_batch(conn, pending, errors)
 
         conn.close()
         print(f"[raspomushi] 檢查完成：找到 {len(unique_ids)} 首，新增 {inserted} 首，跳過 {skipped} 首", flush=True)
@@ -487,6 +880,46 @@ def check_new_songs():
 
 # Apple Music 搜尋用藝人（本實例僅收錄 ポルノグラフティ）
 APPLE_MUSIC_ARTIST = "ポルノグラフティ"
+# 查詢結果快取（歌名 -> (連結或 None, 到期時間)），連結很少變動
+APPLE_MUSIC_CACHE_TTL = 6 * 60 * 60
+APPLE_MUSIC_CACHE_SIZE = 512
+_APPLE_MUSIC_CACHE = {}
+_APPLE_MUSIC_CACHE_LOCK = threading.Lock()
+
+
+def _lookup_apple_music_url(title):
+    """查 iTunes Search API 取得歌曲連結，找不到回傳 None（結果會快取）"""
+    key = title.casefold()
+    now = time.monotonic()
+    with _APPLE_MUSIC_CACHE_LOCK:
+        cached = _APPLE_MUSIC_CACHE.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    _throttle(ITUNES_SEARCH_URL)
+    r = _SESSION.get(
+        ITUNES_SEARCH_URL,
+        params={
+            'term': f"{title} {APPLE_MUSIC_ARTIST}",
+            'media': 'music',
+            'entity': 'song',
+            'limit': 1,
+            'country': 'tw',
+        },
+        timeout=10,
+    )
+    r.raise_for_status()
+    # iTunes 回應為 UTF-8 JSON，直接解析 bytes，略過 requests 的編碼偵測
+    results = json.loads(r.content).get('results') or []
+    url = results[0].get('trackViewUrl') if results else None
+
+    with _APPLE_MUSIC_CACHE_LOCK:
+        _APPLE_MUSIC_CACHE.pop(key, None)
+        if len(_APPLE_MUSIC_CACHE) >= APPLE_MUSIC_CACHE_SIZE:
+            # 移除最早加入的一筆
+            _APPLE_MUSIC_CACHE.pop(next(iter(_APPLE_MUSIC_CACHE)))
+        _APPLE_MUSIC_CACHE[key] = (url, now + APPLE_MUSIC_CACHE_TTL)
+    return url
 
 
 @app.route('/api/apple-music-link', methods=['GET'])
@@ -495,19 +928,8 @@ def get_apple_music_link():
     title = (request.args.get('title') or request.args.get('q') or '').strip()
     if not title:
         return jsonify({'ok': False, 'url': None, 'error': 'missing title'}), 400
-    term = f"{title} {APPLE_MUSIC_ARTIST}"
     try:
-        r = requests.get(
-            'https://itunes.apple.com/search',
-            params={'term': term, 'media': 'music', 'limit': 1, 'country': 'tw'},
-            timeout=10,
-        )
-        r.raise_for_status()
-        data = r.json()
-        results = data.get('results') or []
-        if not results:
-            return jsonify({'ok': False, 'url': None})
-        url = results[0].get('trackViewUrl')
+        url = _lookup_apple_music_url(title)
         if not url:
             return jsonify({'ok': False, 'url': None})
         return jsonify({'ok': True, 'url': url})
@@ -515,6 +937,12 @@ def get_apple_music_link():
         return jsonify({'ok': False, 'url': None, 'error': str(e)}), 500
 
 
+@functools.lru_cache(maxsize=16384)
+def _furigana_cached(text):
+    """to_furigana 的快取版本：前端反覆查詢同一個詞時直接取回結果，不再經過 MeCab"""
+    return to_furigana(text)
+
+
 @app.route('/api/furigana', methods=['GET'])
 def get_furigana():
     """取得日文詞的假名讀音"""
@@ -522,7 +950,7 @@ def get_furigana():
     if not text:
         return jsonify({'ok': False, 'error': 'missing text'}), 400
     
-    reading = to_furigana(text)
+    reading = _furigana_cached(text)
     # 確保 JSON 響應使用 UTF-8 編碼
     response = jsonify({'ok': True, 'text': text, 'reading': reading})
     response.headers['Content-Type'] = 'application/json; charset=utf-8'
@@ -561,6 +989,14 @@ def call_gemini(api_key, prompt):
     raise RuntimeError(f"Gemini 無可用模型：{last_err}")
 
 
+def _parse_retry_after(value):
+    """解析 Retry-After 標頭（秒數），無法解析時回傳 None"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
 def call_groq(api_key, prompt):
     """Groq：優先使用 gpt-oss-120b，找不到則嘗試其他免費模型。會嘗試所有模型直到找到可用的。"""
     headers = {
@@ -586,19 +1022,28 @@ def call_groq(api_key, prompt):
     # 合併所有模型列表
     all_models = preferred_models + fallback_models
     
+    def post(model):
+        return _SESSION.post(
+            GROQ_API_URL,
+            headers=headers,
+            json={
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.7,
+            },
+            timeout=60,
+        )
+
     # 嘗試所有模型
     for model in all_models:
         try:
-            r = requests.post(
-                GROQ_API_URL,
-                headers=headers,
-                json={
-                    "model": model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                },
-                timeout=60,
-            )
+            r = post(model)
+            if r.status_code == 429:
+                # 速率限制：依 Retry-After 等待後以同一模型重試一次
+                retry_after = _parse_retry_after(r.headers.get("Retry-After"))
+                if retry_after is not None:
+                    time.sleep(min(retry_after, GROQ_MAX_RETRY_AFTER))
+                    r = post(model)
             if r.status_code == 200:
                 data = r.json()
                 if "choices" in data and data["choices"]:
@@ -618,6 +1063,10 @@ def call_groq(api_key, prompt):
                         errors.append(f"{model}: HTTP {r.status_code} - {r.text[:100]}")
                 except:
                     errors.append(f"{model}: HTTP {r.status_code} - {r.text[:100] if r.text else '無回應'}")
+                if r.status_code in GROQ_FATAL_STATUS:
+                    raise RuntimeError(f"Groq API Key 無效或額度不足（HTTP {r.status_code}）：{errors[-1]}")
+        except RuntimeError:
+            raise
         except Exception as e:
             errors.append(f"{model}: {str(e)}")
             continue
@@ -632,6 +1081,9 @@ def call_groq(api_key, prompt):
     raise RuntimeError(f"Groq 所有模型都失敗（已嘗試 {len(all_models)} 個模型）：\n{error_summary}")
 
 
+_SENT_SPLIT_RE = re.compile(r'([。！？])')
+
+
 def translate_japanese_to_chinese(text, api_provider, api_key):
     """
     將日文逐句翻譯成繁體中文。
@@ -646,7 +1098,7 @@ def translate_japanese_to_chinese(text, api_provider, api_key):
             sentences.append('')
             continue
         # 按句號、問號、驚嘆號分割
-        parts = re.split(r'([。！？])', line)
+        parts = _SENT_SPLIT_RE.split(line)
         current = ''
         for i, part in enumerate(parts):
             current += part
@@ -713,16 +1165,64 @@ def save_settings():
     return jsonify({'success': True})
 
 
+# 背景翻譯工作：job_id -> 狀態（state: pending / done / error）
+TRANSLATE_JOB_TTL = 60 * 60  # 完成（done / error）後保留多久（秒）供前端查詢
+_TRANSLATE_JOBS = {}
+_TRANSLATE_JOBS_LOCK = threading.Lock()
+
+
+def _update_translate_job(job_id, **fields):
+    """更新工作狀態；進入 done / error 時記下完成時間。工作已不存在則略過"""
+    with _TRANSLATE_JOBS_LOCK:
+        job = _TRANSLATE_JOBS.get(job_id)
+        if job is None:
+            return
+        if fields.get('state') in ('done', 'error'):
+            fields['finished_at'] = time.monotonic()
+        job.update(fields)
+
+
+def _do_translate(job_id, lyric_id, content, api_provider, api_key, version_name):
+    """背景執行：翻譯歌詞並寫入資料庫，結果記錄在工作狀態中"""
+    try:
+        translation_text, model_used = translate_japanese_to_chinese(
+            content, api_provider, api_key
+        )
+
+        # 儲存翻譯
+        now = datetime.now().isoformat()
+        conn = _connect()
+        try:
+            cur = conn.execute(
+                """INSERT INTO translations (lyric_id, version_name, translation_data, created_at, model_used)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (lyric_id, version_name, translation_text, now, model_used)
+            )
+            conn.commit()
+            translation_id = cur.lastrowid
+        finally:
+            conn.close()
+
+        _update_translate_job(
+            job_id,
+            state='done',
+            translation_id=translation_id,
+            translation=translation_text,
+            model_used=model_used,
+        )
+    except Exception as e:
+        _update_translate_job(job_id, state='error', error=str(e))
+
+
 @app.route('/api/lyrics/<int:lyric_id>/translate', methods=['POST'])
 def translate_lyric(lyric_id):
-    """翻譯歌詞"""
+    """翻譯歌詞（非同步背景執行），回傳 job_id 供 /api/translate-jobs/<job_id> 查詢結果"""
     data = request.get_json() or {}
     version_name = (data.get('version_name') or '').strip() or '預設版本'
     
     # 取得歌詞內容
     conn = get_db()
     lyric = conn.execute("SELECT content FROM lyrics WHERE id = ?", (lyric_id,)).fetchone()
-    conn.close()
     
     if not lyric:
         return jsonify({'success': False, 'error': '找不到歌詞'}), 404
@@ -737,44 +1237,48 @@ def translate_lyric(lyric_id):
     if not api_key:
         return jsonify({'success': False, 'error': '請先在設定頁面配置 API Key'}), 400
     
-    try:
-        # 執行翻譯
-        translation_text, model_used = translate_japanese_to_chinese(
-            lyric['content'], api_provider, api_key
-        )
-        
-        # 儲存翻譯
-        now = datetime.now().isoformat()
-        conn = get_db()
-        conn.execute(
-            """INSERT INTO translations (lyric_id, version_name, translation_data, created_at, model_used)
-               VALUES (?, ?, ?, ?, ?)""",
-            (lyric_id, version_name, translation_text, now, model_used)
-        )
-        conn.commit()
-        translation_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'translation_id': translation_id,
-            'translation': translation_text,
-            'model_used': model_used,
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    job_id = uuid.uuid4().hex
+    now = time.monotonic()
+    with _TRANSLATE_JOBS_LOCK:
+        # 清掉完成後已超過保留時間的工作（執行中的工作不清）
+        for old_id in [
+            k for k, j in _TRANSLATE_JOBS.items()
+            if 'finished_at' in j and now - j['finished_at'] > TRANSLATE_JOB_TTL
+        ]:
+            del _TRANSLATE_JOBS[old_id]
+        _TRANSLATE_JOBS[job_id] = {'state': 'pending', 'lyric_id': lyric_id, 'created_at': now}
+
+    thread = threading.Thread(
+        target=_do_translate,
+        args=(job_id, lyric_id, lyric['content'], api_provider, api_key, version_name),
+        daemon=True,
+    )
+    thread.start()
+
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+
+@app.route('/api/translate-jobs/<job_id>', methods=['GET'])
+def get_translate_job(job_id):
+    """查詢背景翻譯工作的狀態；完成時附上 translation_id、translation、model_used"""
+    with _TRANSLATE_JOBS_LOCK:
+        job = dict(_TRANSLATE_JOBS.get(job_id) or {})
+    if not job:
+        return jsonify({'success': False, 'error': '找不到翻譯工作'}), 404
+    job.pop('created_at', None)
+    job.pop('finished_at', None)
+    return jsonify({'success': True, **job})
 
 
 @app.route('/api/lyrics/<int:lyric_id>/translations', methods=['GET'])
 def get_translations(lyric_id):
     """取得歌詞的所有翻譯版本"""
-    conn = get_db()
+    conn = get_db(readonly=True)
     translations = conn.execute(
         """SELECT id, version_name, translation_data, created_at, model_used
            FROM translations WHERE lyric_id = ? ORDER BY created_at DESC""",
         (lyric_id,)
     ).fetchall()
-    conn.close()
     
     result = []
     for t in translations:
@@ -795,7 +1299,6 @@ def delete_translation(translation_id):
     conn = get_db()
     conn.execute("DELETE FROM translations WHERE id = ?", (translation_id,))
     conn.commit()
-    conn.close()
     return jsonify({'success': True})
 
 
@@ -815,9 +1318,8 @@ def api_rasword_add_word():
     source_lyric_id = None
     if lyric_id:
         try:
-            conn = get_db()
+            conn = get_db(readonly=True)
             row = conn.execute("SELECT id, title, content FROM lyrics WHERE id = ?", (int(lyric_id),)).fetchone()
-            conn.close()
             if row:
                 source_title = row["title"] or ""
                 source_lyric_id = row["id"]
@@ -846,7 +1348,6 @@ def api_rasword_add_word():
                 (lyric_id,),
             )
             conn.commit()
-            conn.close()
         except Exception as e:
             print(f"[raspomushi] 更新 saved_word_count 失敗 (lyric_id={lyric_id}): {e}")
     return jsonify(payload), status
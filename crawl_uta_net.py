@@ -11,12 +11,16 @@ import argparse
 import os
 import re
 import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 與 app.py 共用同一個資料庫
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -29,17 +33,56 @@ ARTIST_PAGE_PATHS = [
     "/artist/{}/".format(ARTIST_ID),
     "/artist/{}/0/2/".format(ARTIST_ID),
 ]
-REQUEST_DELAY = 1.5  # 每次請求間隔（秒）
+REQUEST_DELAY = 1.5  # 每次請求間隔（秒），所有 worker 合計
+MAX_WORKERS = 4  # 同時下載歌曲頁的執行緒數
+COMMIT_EVERY = 50  # 每成功寫入幾首 commit 一次（同一交易內批次寫入）
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0",
     "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "ja,en-US;q=0.7,en;q=0.3",
 }
 
+# 歌手一覽頁的歌曲連結：<a href="/song/12345/">
+SONG_LINK_RE = re.compile(r"""href=["']/song/(\d+)""")
+# <title> 結尾的「歌詞 - 歌ネット」與歌詞中連續 3 個以上的換行
+TITLE_SUFFIX_RE = re.compile(r"\s*歌詞\s*-\s*歌ネット\s*$")
+MULTI_NL_RE = re.compile(r"\n{3,}")
+# 歌詞區塊候選（依優先順序）：id 為 kashi_area / kashi，或 class 含 kashi_area / kashi / song_table
+LYRICS_DIV_SELECTORS = (
+    "div#kashi_area",
+    "div#kashi",
+    'div[class*="kashi_area"]',
+    'div[class*="kashi"]',
+    'div[class*="song_table"]',
+)
+# 依 idx_lyrics_title 唯一索引 upsert：新歌名新增，已存在則更新歌詞
+UPSERT_SQL = """INSERT INTO lyrics (title, content, created_at, updated_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(title) DO UPDATE SET
+        content = excluded.content, updated_at = excluded.updated_at"""
+
+# 整個爬取過程共用一個 session，重用 TCP/TLS 連線
+# 只對 5xx 快速重試少數幾次；429 不重試，以免 adapter 內的重試繞過 wait_turn 的頻率限制
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=2, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+        respect_retry_after_header=False,
+    ),
+))
+
 
 def get_db():
     conn = sqlite3.connect(DATABASE)
     conn.row_factory = sqlite3.Row
+    # WAL：與 app.py 同時開啟時讀寫互不阻塞；synchronous=NORMAL 減少 fsync
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
     return conn
 
 
@@ -55,31 +98,44 @@ def init_db(conn):
     """)
     conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_lyrics_title ON lyrics(title)")
     conn.commit()
+    # UPSERT_SQL 的 ON CONFLICT(title) 需要唯一索引；同名索引若不是唯一的就直接中止
+    unique = {row["name"]: row["unique"] for row in conn.execute("PRAGMA index_list('lyrics')")}
+    if not unique.get("idx_lyrics_title"):
+        raise SystemExit("idx_lyrics_title is not a UNIQUE index; remove duplicate titles and drop the index first.")
+
+
+_rate_lock = threading.Lock()
+_next_request_at = 0.0
+
+
+def wait_turn():
+    """限制整體請求頻率：所有執行緒共用同一個時間表，每 REQUEST_DELAY 秒最多送出一個請求。"""
+    global _next_request_at
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_at - now
+        _next_request_at = max(now, _next_request_at) + REQUEST_DELAY
+    if wait > 0:
+        time.sleep(wait)
 
 
 def fetch(url):
-    r = requests.get(url, headers=HEADERS, timeout=15)
+    wait_turn()
+    r = SESSION.get(url, timeout=15)
     r.raise_for_status()
-    r.encoding = r.apparent_encoding or "utf-8"
-    return r.text
+    # uta-net 為 UTF-8，直接解碼（不用 apparent_encoding 對整頁做編碼偵測）
+    return r.content.decode("utf-8", errors="replace")
 
 
 def extract_song_ids_from_artist_page(html):
     """從歌手一覽頁解析出所有歌曲頁的 ID（/song/12345/ -> 12345）。"""
-    soup = BeautifulSoup(html, "html.parser")
-    ids = []
-    for a in soup.find_all("a", href=True):
-        m = re.match(r"/song/(\d+)/?", a.get("href", ""))
-        if m:
-            sid = m.group(1)
-            if sid not in ids:
-                ids.append(sid)
-    return ids
+    # 只需要連結中的數字 ID，直接對原始 HTML 做一次正則掃描，不建 DOM；dict.fromkeys 去重並保持順序
+    return list(dict.fromkeys(SONG_LINK_RE.findall(html)))
 
 
 def extract_title_and_lyrics(html, song_url):
     """從歌曲頁解析歌名與歌詞本文。"""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, "lxml")
     title = ""
     # 歌名：常見在 h2（曲名）或 title 裡 "歌手名 曲名 歌詞"
     h2 = soup.find("h2")
@@ -88,7 +144,7 @@ def extract_title_and_lyrics(html, song_url):
     if not title and soup.title:
         # title 多為 "ポルノグラフィティ 曲名 歌詞 - 歌ネット"
         t = soup.title.string or ""
-        t = re.sub(r"\s*歌詞\s*-\s*歌ネット\s*$", "", t).strip()
+        t = TITLE_SUFFIX_RE.sub("", t).strip()
         if t:
             parts = t.split(None, 1)
             title = parts[1] if len(parts) > 1 else parts[0]
@@ -96,22 +152,11 @@ def extract_title_and_lyrics(html, song_url):
         title = "unknown"
 
     # 歌詞：uta-net 常見在 id="kashi_area" 或 class 含 kashi 的 div
-    lyrics_div = soup.find("div", id="kashi_area") or soup.find("div", id="kashi")
-    if not lyrics_div:
-        for c in ("kashi_area", "kashi", "song_table"):
-            lyrics_div = soup.find("div", class_=lambda x: x and c in (x or ""))
-            if lyrics_div:
-                break
-    if not lyrics_div:
-        # 備援：取第一個含大量文字的 div（排除 nav/footer）
-        for div in soup.find_all("div"):
-            if div.get("id") in ("header", "footer", "nav", "menu"):
-                continue
-            text = div.get_text(separator="\n", strip=True)
-            if len(text) > 100 and "歌詞" in text or "作詞" in div.get_text():
-                # 可能含歌詞區，取該 div 內純文字
-                lyrics_div = div
-                break
+    lyrics_div = None
+    for selector in LYRICS_DIV_SELECTORS:
+        lyrics_div = soup.select_one(selector)
+        if lyrics_div:
+            break
 
     content = ""
     if lyrics_div:
@@ -124,11 +169,22 @@ def extract_title_and_lyrics(html, song_url):
             content = content.split("この歌詞をマイ歌ネットに登録")[0].strip()
         if "この曲のフレーズを投稿" in content:
             content = content.split("この曲のフレーズを投稿")[0].strip()
-        content = re.sub(r"\n{3,}", "\n\n", content).strip()
+        content = MULTI_NL_RE.sub("\n\n", content).strip()
 
     return title, content
 
 
+def fetch_and_parse(sid):
+    """下載並解析單首歌曲頁（於 worker 執行緒執行），回傳 (sid, url, title, content, error)。"""
+    url = urljoin(BASE_URL, "/song/{}/".format(sid))
+    try:
+        html = fetch(url)
+        title, content = extract_title_and_lyrics(html, url)
+    except Exception as e:
+        return sid, url, "", "", e
+    return sid, url, title, content, None
+
+
 def main():
     parser = argparse.ArgumentParser(description="爬取 uta-net 歌手歌詞寫入 raspomushi.db")
     parser.add_argument("--limit", type=int, default=0, help="只爬前 N 首（0=全部）")
@@ -146,7 +202,6 @@ def main():
             html = fetch(url)
             ids = extract_song_ids_from_artist_page(html)
             all_ids.extend(ids)
-            time.sleep(REQUEST_DELAY)
         except Exception as e:
             print("Error fetching list:", e)
             continue
@@ -171,44 +226,37 @@ def main():
 
     inserted = 0
     updated = 0
-    for i, sid in enumerate(unique_ids):
-        url = urljoin(BASE_URL, "/song/{}/".format(sid))
-        try:
-            html = fetch(url)
-            title, content = extract_title_and_lyrics(html, url)
-        except Exception as e:
-            print("  [{}] Error {}: {}".format(sid, url, e))
-            time.sleep(REQUEST_DELAY)
-            continue
+    # 已存在的歌名（含本次寫入過的），用來判斷 upsert 是新增還是更新
+    existing = {row[0] for row in conn.execute("SELECT title FROM lyrics")}
+    # 整個迴圈共用同一個 cursor 與同一句 SQL，每首歌只執行一次已編譯的 upsert
+    cur = conn.cursor()
+    # 下載與解析交給 worker 平行處理（整體頻率由 wait_turn 控制），資料庫寫入留在主執行緒
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(fetch_and_parse, unique_ids)
+        for i, (sid, url, title, content, error) in enumerate(results):
+            if error is not None:
+                print("  [{}] Error {}: {}".format(sid, url, error))
+                continue
 
-        if not content or len(content) < 10:
-            print("  [{}] Skip (no lyrics): {}".format(sid, title[:40]))
-            time.sleep(REQUEST_DELAY)
-            continue
+            if not content or len(content) < 10:
+                print("  [{}] Skip (no lyrics): {}".format(sid, title[:40]))
+                continue
 
-        try:
-            cur = conn.execute(
-                "SELECT id FROM lyrics WHERE title = ?", (title,)
-            )
-            row = cur.fetchone()
-            if row:
-                conn.execute(
-                    "UPDATE lyrics SET content = ?, updated_at = ? WHERE id = ?",
-                    (content, now, row["id"]),
-                )
-                updated += 1
+            try:
+                cur.execute(UPSERT_SQL, (title, content, now, now))
+            except Exception as e:
+                print("  DB error for {}: {}".format(title[:30], e))
             else:
-                conn.execute(
-                    """INSERT INTO lyrics (title, content, created_at, updated_at)
-                       VALUES (?, ?, ?, ?)""",
-                    (title, content, now, now),
-                )
-                inserted += 1
-        except Exception as e:
-            print("  DB error for {}: {}".format(title[:30], e))
+                if title in existing:
+                    updated += 1
+                else:
+                    existing.add(title)
+                    inserted += 1
+                # 以成功寫入的筆數計算，跳過或失敗的歌曲不影響 commit 時機
+                if (inserted + updated) % COMMIT_EVERY == 0:
+                    conn.commit()
 
-        print("  [{}/{}] {}: {} chars".format(i + 1, len(unique_ids), title[:50], len(content)))
-        time.sleep(REQUEST_DELAY)
+            print("  [{}/{}] {}: {} chars".format(i + 1, len(unique_ids), title[:50], len(content)))
 
     conn.commit()
     conn.close()